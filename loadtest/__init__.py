@@ -0,0 +1 @@
+# Load-testing harness: local YouTube stand-in and concurrent load driver
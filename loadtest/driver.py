@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+DJ Downloader Pro - Load Driver
+Fires concurrent download jobs at a running server and reports capacity figures:
+jobs/sec, per-stage latency percentiles, error rate and server RSS.
+
+Typical run (starts the stand-in and the app itself):
+    python -m loadtest.driver --launch --jobs 40 --concurrency 8
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import string
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from loadtest.stub_server import create_server, start_server_thread, source_environment
+
+BASE_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+
+# Server-side statuses in the order process_download_task moves through them
+STAGES = ['queued', 'downloading', 'analyzing', 'processing', 'completed']
+
+def random_video_id():
+    """Random 11-character id so every job is a distinct track."""
+    return ''.join(random.choice(string.ascii_letters + string.digits + '_-') for _ in range(11))
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+def read_rss(pid):
+    """Resident set size of a process in bytes, or None if unavailable."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+class RssSampler:
+    """Poll a process's RSS on a background thread."""
+
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = read_rss(self.pid)
+            if rss is not None:
+                self.samples.append(rss)
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+def run_job(session, server_url, poll_interval, timeout):
+    """Drive one job through submit, status polling and file download."""
+    job = {'stages': {}, 'error': None}
+    url = f"https://www.youtube.com/watch?v={random_video_id()}"
+    started = time.monotonic()
+
+    try:
+        response = session.post(f"{server_url}/api/download", data={'url': url}, timeout=30)
+        response.raise_for_status()
+        task_id = response.json()['task_id']
+        submitted = time.monotonic()
+        job['stages']['submit'] = submitted - started
+
+        # Record when each status is first observed
+        seen = {'queued': submitted}
+        status = 'queued'
+        while status not in ('completed', 'error'):
+            if time.monotonic() - started > timeout:
+                raise TimeoutError(f"Job {task_id} still '{status}' after {timeout}s")
+            time.sleep(poll_interval)
+            response = session.get(f"{server_url}/api/status/{task_id}", timeout=30)
+            response.raise_for_status()
+            status = response.json()['status']
+            seen.setdefault(status, time.monotonic())
+
+        if status == 'error':
+            raise RuntimeError(response.json().get('message', 'Job failed'))
+
+        # Time spent in each stage is the gap to the next stage that was observed
+        observed = [stage for stage in STAGES if stage in seen]
+        for current, following in zip(observed, observed[1:]):
+            job['stages'][current] = seen[following] - seen[current]
+
+        fetch_started = time.monotonic()
+        response = session.get(f"{server_url}/api/download/{task_id}", timeout=60)
+        response.raise_for_status()
+        job['stages']['fetch'] = time.monotonic() - fetch_started
+        job['bytes'] = len(response.content)
+
+    except Exception as e:
+        job['error'] = str(e)
+
+    job['stages']['total'] = time.monotonic() - started
+    return job
+
+def summarize(jobs, elapsed, rss_samples):
+    """Aggregate job results into the report dictionary."""
+    succeeded = [job for job in jobs if not job['error']]
+    report = {
+        'jobs': len(jobs),
+        'succeeded': len(succeeded),
+        'errors': len(jobs) - len(succeeded),
+        'error_rate': (len(jobs) - len(succeeded)) / len(jobs) if jobs else 0.0,
+        'elapsed_seconds': elapsed,
+        'jobs_per_second': len(succeeded) / elapsed if elapsed > 0 else 0.0,
+        'stages': {},
+        'server_rss': None,
+        'error_samples': sorted({job['error'] for job in jobs if job['error']})[:5]
+    }
+
+    for stage in ['submit'] + STAGES[:-1] + ['fetch', 'total']:
+        values = [job['stages'][stage] for job in succeeded if stage in job['stages']]
+        if values:
+            report['stages'][stage] = {
+                'p50': percentile(values, 50),
+                'p95': percentile(values, 95),
+                'p99': percentile(values, 99)
+            }
+
+    if rss_samples:
+        report['server_rss'] = {
+            'start': rss_samples[0],
+            'peak': max(rss_samples),
+            'end': rss_samples[-1]
+        }
+
+    return report
+
+def print_report(report):
+    print("\n📊 Load test report")
+    print("=" * 40)
+    print(f"Jobs: {report['jobs']}  succeeded: {report['succeeded']}  errors: {report['errors']}")
+    print(f"Error rate: {report['error_rate']:.1%}")
+    print(f"Elapsed: {report['elapsed_seconds']:.1f}s  throughput: {report['jobs_per_second']:.3f} jobs/sec")
+
+    print(f"\n{'stage':<12}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for stage, stats in report['stages'].items():
+        print(f"{stage:<12}{stats['p50']:>9.2f}s{stats['p95']:>9.2f}s{stats['p99']:>9.2f}s")
+
+    rss = report['server_rss']
+    if rss:
+        mb = 1024 * 1024
+        print(f"\nServer RSS: start {rss['start'] / mb:.0f} MB, "
+              f"peak {rss['peak'] / mb:.0f} MB, end {rss['end'] / mb:.0f} MB")
+    else:
+        print("\nServer RSS: unavailable (pass --server-pid or --launch)")
+
+    for error in report['error_samples']:
+        print(f"❌ {error}")
+
+def launch_app(args, environment):
+    """Start the app in a subprocess pointed at the stand-in."""
+    code = (
+        "from app import create_app; "
+        f"create_app({{'TEMP_FOLDER': {args.temp_folder!r}}}).run("
+        f"host='127.0.0.1', port={args.app_port}, debug=False, threaded=True)"
+    )
+    env = dict(os.environ, **environment)
+    process = subprocess.Popen([sys.executable, '-c', code], cwd=BASE_DIR, env=env)
+
+    # Wait for the app to accept connections
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{args.app_port}/api/status/ping", timeout=1)
+            return process
+        except requests.ConnectionError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.2)
+
+    process.kill()
+    raise RuntimeError("App did not start")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Concurrent load driver for DJ Downloader Pro.")
+    parser.add_argument('--server', default='http://127.0.0.1:5000',
+                        help="Base URL of a running app (ignored with --launch)")
+    parser.add_argument('--server-pid', type=int, help="PID of the running app, for RSS sampling")
+    parser.add_argument('--jobs', type=int, default=20, help="Total number of jobs to run")
+    parser.add_argument('--concurrency', type=int, default=4, help="Jobs in flight at once")
+    parser.add_argument('--poll-interval', type=float, default=0.25,
+                        help="Seconds between status polls per job")
+    parser.add_argument('--timeout', type=float, default=600, help="Per-job timeout in seconds")
+    parser.add_argument('--json', help="Also write the report to this file as JSON")
+
+    launch = parser.add_argument_group('self-contained run')
+    launch.add_argument('--launch', action='store_true',
+                        help="Start the stand-in and the app before driving load")
+    launch.add_argument('--app-port', type=int, default=5055)
+    launch.add_argument('--temp-folder', default=os.path.join(BASE_DIR, '.loadtest-tmp'))
+    launch.add_argument('--duration', type=int, default=180, help="Fixture audio length in seconds")
+    launch.add_argument('--latency', type=float, default=0.0, help="Stand-in time to first byte, paid per request")
+    launch.add_argument('--throughput', type=int, default=0,
+                        help="Stand-in bytes/sec per response (0 = unthrottled)")
+
+    gates = parser.add_argument_group('regression gates (non-zero exit when breached)')
+    gates.add_argument('--max-error-rate', type=float, help="e.g. 0.01 for 1%%")
+    gates.add_argument('--min-jobs-per-sec', type=float)
+    gates.add_argument('--max-p95', type=float, help="Ceiling in seconds for p95 end-to-end latency")
+    gates.add_argument('--max-rss-mb', type=float, help="Ceiling for peak server RSS")
+    return parser
+
+def check_gates(args, report):
+    """Return the list of breached regression gates."""
+    breaches = []
+    if args.max_error_rate is not None and report['error_rate'] > args.max_error_rate:
+        breaches.append(f"error rate {report['error_rate']:.1%} > {args.max_error_rate:.1%}")
+    if args.min_jobs_per_sec is not None and report['jobs_per_second'] < args.min_jobs_per_sec:
+        breaches.append(f"throughput {report['jobs_per_second']:.3f} < {args.min_jobs_per_sec} jobs/sec")
+    total = report['stages'].get('total')
+    if args.max_p95 is not None and (not total or total['p95'] > args.max_p95):
+        breaches.append(f"p95 latency above {args.max_p95}s")
+    rss = report['server_rss']
+    if args.max_rss_mb is not None and rss and rss['peak'] > args.max_rss_mb * 1024 * 1024:
+        breaches.append(f"peak RSS above {args.max_rss_mb} MB")
+    return breaches
+
+def main():
+    args = build_parser().parse_args()
+    server_url, server_pid, app_process, stand_in = args.server, args.server_pid, None, None
+
+    if args.launch:
+        print("🎵 Starting stand-in and app...")
+        os.makedirs(args.temp_folder, exist_ok=True)
+        stand_in = create_server(port=0, duration=args.duration,
+                                 latency=args.latency, throughput=args.throughput)
+        stand_in_url = start_server_thread(stand_in)
+        app_process = launch_app(args, source_environment(stand_in_url))
+        server_url, server_pid = f"http://127.0.0.1:{args.app_port}", app_process.pid
+
+    sampler = RssSampler(server_pid).start() if server_pid else None
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency))
+
+    try:
+        print(f"🚀 Running {args.jobs} jobs, {args.concurrency} at a time, against {server_url}")
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            futures = [pool.submit(run_job, session, server_url, args.poll_interval, args.timeout)
+                       for _ in range(args.jobs)]
+            jobs = [future.result() for future in futures]
+        elapsed = time.monotonic() - started
+    finally:
+        if sampler:
+            sampler.stop()
+        if app_process:
+            app_process.terminate()
+            app_process.wait()
+        if stand_in:
+            stand_in.shutdown()
+
+    report = summarize(jobs, elapsed, sampler.samples if sampler else [])
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    breaches = check_gates(args, report)
+    for breach in breaches:
+        print(f"❌ Gate breached: {breach}")
+    sys.exit(1 if breaches else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+DJ Downloader Pro - Local YouTube Stand-in
+Serves fixture audio and thumbnails so the service can be load-tested offline.
+
+Routes:
+    /audio/<video_id>.mp3       fixture audio (point DJ_VIDEO_URL_TEMPLATE here)
+    /vi/<video_id>/<name>.jpg   fixture thumbnail (point DJ_THUMBNAIL_BASE_URL at /vi)
+
+The configured latency is paid by every request, not once per job: yt-dlp
+opens the media URL once to check its type before downloading it, so each
+job waits roughly twice the latency for its audio.
+"""
+
+import os
+import re
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHUNK_SIZE = 64 * 1024
+
+AUDIO_ROUTE = re.compile(r'^/audio/([a-zA-Z0-9_-]{11})\.mp3$')
+THUMBNAIL_ROUTE = re.compile(r'^/vi/([a-zA-Z0-9_-]{11})/[a-z0-9]+\.jpg$')
+
+def generate_fixture_audio(output_path, duration):
+    """Render a tone-and-click MP3 fixture with FFmpeg."""
+    subprocess.run([
+        'ffmpeg', '-y',
+        '-f', 'lavfi', '-i', f'sine=frequency=220:beep_factor=4:duration={duration}',
+        '-c:a', 'libmp3lame', '-b:a', '192k',
+        output_path
+    ], check=True, capture_output=True)
+    return output_path
+
+def generate_fixture_thumbnail(output_path):
+    """Render a test-pattern JPEG fixture with FFmpeg."""
+    subprocess.run([
+        'ffmpeg', '-y',
+        '-f', 'lavfi', '-i', 'testsrc=size=1280x720',
+        '-frames:v', '1',
+        output_path
+    ], check=True, capture_output=True)
+    return output_path
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serve fixtures with the latency and throughput set on the server."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_HEAD(self):
+        self.handle_fixture(send_body=False)
+
+    def do_GET(self):
+        self.handle_fixture(send_body=True)
+
+    def handle_fixture(self, send_body):
+        if AUDIO_ROUTE.match(self.path):
+            data, content_type = self.server.audio_data, 'audio/mpeg'
+        elif THUMBNAIL_ROUTE.match(self.path):
+            data, content_type = self.server.thumbnail_data, 'image/jpeg'
+        else:
+            self.send_error(404)
+            return
+
+        # Simulated time to first byte
+        if self.server.latency > 0:
+            time.sleep(self.server.latency)
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+
+        if send_body:
+            self.write_throttled(data)
+
+    def write_throttled(self, data):
+        """Write the body in chunks, pacing them to the configured throughput."""
+        throughput = self.server.throughput
+        started = time.monotonic()
+
+        for offset in range(0, len(data), CHUNK_SIZE):
+            try:
+                self.wfile.write(data[offset:offset + CHUNK_SIZE])
+            except (BrokenPipeError, ConnectionResetError):
+                # Client hung up early (e.g. yt-dlp probing the Content-Type)
+                self.close_connection = True
+                return
+            if throughput > 0:
+                sent = min(offset + CHUNK_SIZE, len(data))
+                delay = sent / throughput - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def create_server(host='127.0.0.1', port=8765, audio_path=None, thumbnail_path=None,
+                  duration=180, latency=0.0, throughput=0, verbose=False):
+    """Create the stand-in server, rendering fixtures if none are given."""
+    # Fixtures are served from memory, so the rendered files only live until they are read
+    with tempfile.TemporaryDirectory(prefix='dj-loadtest-') as fixture_dir:
+        if not audio_path:
+            audio_path = generate_fixture_audio(os.path.join(fixture_dir, 'fixture.mp3'), duration)
+        if not thumbnail_path:
+            thumbnail_path = generate_fixture_thumbnail(os.path.join(fixture_dir, 'fixture.jpg'))
+
+        with open(audio_path, 'rb') as f:
+            audio_data = f.read()
+        with open(thumbnail_path, 'rb') as f:
+            thumbnail_data = f.read()
+
+    server = ThreadingHTTPServer((host, port), StandInHandler)
+    server.daemon_threads = True
+    server.audio_data = audio_data
+    server.thumbnail_data = thumbnail_data
+    server.latency = latency
+    server.throughput = throughput
+    server.verbose = verbose
+    return server
+
+def start_server_thread(server):
+    """Run the server on a daemon thread and return its base URL."""
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+def source_environment(base_url):
+    """Environment that points the app's media sources at the stand-in."""
+    return {
+        'DJ_VIDEO_URL_TEMPLATE': f"{base_url}/audio/{{video_id}}.mp3",
+        'DJ_THUMBNAIL_BASE_URL': f"{base_url}/vi"
+    }
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Local YouTube stand-in for load testing.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--audio', help="Fixture MP3 to serve (rendered with FFmpeg if omitted)")
+    parser.add_argument('--thumbnail', help="Fixture JPEG to serve (rendered with FFmpeg if omitted)")
+    parser.add_argument('--duration', type=int, default=180,
+                        help="Length in seconds of the rendered fixture audio")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="Seconds to wait before answering each request "
+                             "(paid per request, so about twice per audio download)")
+    parser.add_argument('--throughput', type=int, default=0,
+                        help="Bytes per second per response (0 = unthrottled)")
+    parser.add_argument('--verbose', action='store_true', help="Log every request")
+    return parser
+
+def main():
+    args = build_parser().parse_args()
+    server = create_server(args.host, args.port, args.audio, args.thumbnail,
+                           args.duration, args.latency, args.throughput, args.verbose)
+    base_url = f"http://{args.host}:{server.server_address[1]}"
+
+    print(f"🎵 Stand-in serving on {base_url}")
+    print("Start the app with:")
+    for name, value in source_environment(base_url).items():
+        print(f"  export {name}='{value}'")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,17 @@
 import numpy as np
 import librosa
 from .config import AUDIO_ANALYSIS
+from .profiler import record_timing
 
 # Key detection profiles
 MAJOR_PROFILE = np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.32, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88])
 MINOR_PROFILE = np.array([6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17])
 KEYS_LIST = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
 
+# ITU-R BS.1770 K-weighting stages as (gain dB, Q, centre frequency Hz)
+K_WEIGHTING_SHELF = (4.0, 1 / np.sqrt(2), 1500.0)
+K_WEIGHTING_HIGHPASS = (0.0, 0.5, 38.0)
+
 # Cache for analysis results
 analysis_cache = {}
 
@@ -29,25 +34,145 @@ def detect_key(chroma):
         key_idx = minor_corrs.index(max_minor)
         return f"{KEYS_LIST[key_idx]} Minor"
 
-def analyze_audio_file(file_path):
-    """Analyze an audio file to extract BPM and musical key."""
+def k_weighting_response(freqs, sr):
+    """Power response of the BS.1770 K-weighting filter at the given frequencies."""
+    z = np.exp(-1j * 2 * np.pi * freqs / sr)
+    
+    # High-shelf stage (head effects)
+    gain, q, fc = K_WEIGHTING_SHELF
+    A = 10 ** (gain / 40.0)
+    w0 = 2 * np.pi * fc / sr
+    alpha = np.sin(w0) / (2 * q)
+    shelf_b = [A * ((A + 1) + (A - 1) * np.cos(w0) + 2 * np.sqrt(A) * alpha),
+               -2 * A * ((A - 1) + (A + 1) * np.cos(w0)),
+               A * ((A + 1) + (A - 1) * np.cos(w0) - 2 * np.sqrt(A) * alpha)]
+    shelf_a = [(A + 1) - (A - 1) * np.cos(w0) + 2 * np.sqrt(A) * alpha,
+               2 * ((A - 1) - (A + 1) * np.cos(w0)),
+               (A + 1) - (A - 1) * np.cos(w0) - 2 * np.sqrt(A) * alpha]
+    
+    # High-pass stage (RLB weighting)
+    _, q, fc = K_WEIGHTING_HIGHPASS
+    w0 = 2 * np.pi * fc / sr
+    alpha = np.sin(w0) / (2 * q)
+    highpass_b = [(1 + np.cos(w0)) / 2, -(1 + np.cos(w0)), (1 + np.cos(w0)) / 2]
+    highpass_a = [1 + alpha, -2 * np.cos(w0), 1 - alpha]
+    
+    response = np.ones_like(freqs, dtype=complex)
+    for b, a in ((shelf_b, shelf_a), (highpass_b, highpass_a)):
+        response *= np.polyval(b[::-1], z) / np.polyval(a[::-1], z)
+    
+    return np.abs(response) ** 2
+
+def integrated_loudness(channel_power, sr, n_fft, hop_length):
+    """Gated integrated loudness (LUFS) measured on per-channel power spectrograms.
+    
+    Follows BS.1770 (K-weighting, 400ms blocks, absolute and relative gates),
+    with the K-weighting applied per frequency bin and the weighted power of
+    the channels summed, so channel_power has shape (channels, bins, frames).
+    """
+    weights = k_weighting_response(librosa.fft_frequencies(sr=sr, n_fft=n_fft), sr)
+    
+    # One-sided spectrum: every bin except DC and Nyquist appears twice
+    weights[1:-1] *= 2
+    window = librosa.filters.get_window('hann', n_fft)
+    frame_power = np.sum(weights @ channel_power, axis=0) / (n_fft * np.sum(window ** 2))
+    
+    # Mean power of 400ms blocks overlapping by 75%
+    block = max(1, int(round(0.4 * sr / hop_length)))
+    step = max(1, int(round(0.1 * sr / hop_length)))
+    if len(frame_power) < block:
+        block_power = np.array([np.mean(frame_power)])
+    else:
+        cumulative = np.concatenate(([0.0], np.cumsum(frame_power)))
+        starts = np.arange(0, len(frame_power) - block + 1, step)
+        block_power = (cumulative[starts + block] - cumulative[starts]) / block
+    
+    block_loudness = -0.691 + 10 * np.log10(np.maximum(block_power, 1e-12))
+    gated = block_loudness > -70.0
+    if not np.any(gated):
+        return -70.0
+    
+    relative_gate = -0.691 + 10 * np.log10(np.mean(block_power[gated])) - 10.0
+    gated &= block_loudness > relative_gate
+    return float(-0.691 + 10 * np.log10(np.mean(block_power[gated])))
+
+def extract_features(y, sr):
+    """Compute one spectrogram and derive every per-track feature from it.
+    
+    y may be mono or have shape (channels, samples). Loudness sums the power
+    of the channels; the other features use their mean power.
+    
+    Returns the onset envelope and chromagram needed for tempo and key
+    detection, plus a compact feature record of per-track summaries.
+    """
+    n_fft = AUDIO_ANALYSIS['n_fft']
+    hop_length = AUDIO_ANALYSIS['hop_length']
+    
+    stft = librosa.stft(y, n_fft=n_fft, hop_length=hop_length)
+    channel_power = (np.abs(stft) ** 2).reshape(-1, *stft.shape[-2:])
+    power = np.mean(channel_power, axis=0)
+    magnitude = np.sqrt(power)
+    
+    # Onset envelope from the log-mel spectrogram, median-aggregated as beat_track does internally
+    mel = librosa.feature.melspectrogram(S=power, sr=sr)
+    onset_env = librosa.onset.onset_strength(
+        S=librosa.power_to_db(mel),
+        sr=sr,
+        hop_length=hop_length,
+        aggregate=np.median
+    )
+    
+    chroma = librosa.feature.chroma_stft(S=power, sr=sr)
+    rms = librosa.feature.rms(S=magnitude, frame_length=n_fft, hop_length=hop_length)
+    loudness = integrated_loudness(channel_power, sr, n_fft, hop_length)
+    
+    chroma_profile = np.mean(chroma, axis=1)
+    chroma_profile /= max(np.max(chroma_profile), 1e-12)
+    
+    record = {
+        'duration': round(float(y.shape[-1] / sr), 2),
+        'loudness': round(loudness, 2),
+        'replay_gain': round(AUDIO_ANALYSIS['replaygain_reference'] - loudness, 2),
+        'peak': round(float(np.max(np.abs(y))) if y.size else 0.0, 4),
+        'energy': round(float(np.mean(rms)), 4),
+        'chroma': [round(float(value), 3) for value in chroma_profile]
+    }
+    
+    return onset_env, chroma, record
+
+def analyze_audio_file(file_path, duration=None):
+    """Analyze an audio file to extract BPM and musical key.
+    
+    If duration is given, only the first duration seconds are analyzed and
+    the (partial) result is not cached.
+    """
+    use_cache = AUDIO_ANALYSIS['use_cache'] and duration is None
+    
     # Check cache first if enabled
-    if AUDIO_ANALYSIS['use_cache'] and file_path in analysis_cache:
+    if use_cache and file_path in analysis_cache:
         return analysis_cache[file_path]
     
     try:
-        # Load audio with specified sample rate
-        y, sr = librosa.load(
-            file_path, 
-            sr=AUDIO_ANALYSIS['sr']
-        )
+        # Load audio with specified sample rate, keeping the channels for loudness
+        with record_timing('librosa.load'):
+            y, sr = librosa.load(
+                file_path, 
+                sr=AUDIO_ANALYSIS['sr'],
+                mono=False,
+                duration=duration
+            )
+        
+        # Single spectral pass shared by tempo, key and loudness
+        with record_timing('extract_features'):
+            onset_env, chroma, features = extract_features(y, sr)
         
         # Calculate tempo (BPM)
-        tempo, _ = librosa.beat.beat_track(
-            y=y, 
-            sr=sr, 
-            hop_length=AUDIO_ANALYSIS['hop_length']
-        )
+        with record_timing('beat_track'):
+            tempo, _ = librosa.beat.beat_track(
+                onset_envelope=onset_env, 
+                sr=sr, 
+                hop_length=AUDIO_ANALYSIS['hop_length']
+            )
         
         # Ensure tempo is a scalar
         if isinstance(tempo, (list, np.ndarray)):
@@ -55,17 +180,18 @@ def analyze_audio_file(file_path):
         else:
             tempo = float(tempo)
         
-        # Calculate chromagram for key detection
-        chroma = librosa.feature.chroma_cqt(y=y, sr=sr)
-        key_detected = detect_key(chroma)
+        # Detect key from the shared chromagram
+        with record_timing('detect_key'):
+            key_detected = detect_key(chroma)
         
         result = {
             'bpm': int(round(tempo)),
-            'key': key_detected
+            'key': key_detected,
+            'features': features
         }
         
         # Cache the result
-        if AUDIO_ANALYSIS['use_cache']:
+        if use_cache:
             analysis_cache[file_path] = result
             
         return result
@@ -74,5 +200,6 @@ def analyze_audio_file(file_path):
         print(f"Error analyzing audio: {e}")
         return {
             'bpm': 0,
-            'key': 'Unknown'
+            'key': 'Unknown',
+            'features': {}
         }
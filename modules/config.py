@@ -14,6 +14,21 @@ APP_CONFIG = {
     'MAX_CONTENT_LENGTH': 500 * 1024 * 1024  # 500MB max upload size
 }
 
+# Media source endpoints
+# Override via environment to point downloads at a local stand-in (see loadtest/)
+MEDIA_SOURCES = {
+    'thumbnail_base_url': os.environ.get('DJ_THUMBNAIL_BASE_URL', 'https://img.youtube.com/vi'),
+    # e.g. 'http://127.0.0.1:8765/audio/{video_id}.mp3'; None downloads the original URL
+    'video_url_template': os.environ.get('DJ_VIDEO_URL_TEMPLATE')
+}
+
+# Per-job profiling (opt in per request with profile=1, or sample a fraction of jobs)
+PROFILING = {
+    'sample_fraction': float(os.environ.get('DJ_PROFILE_SAMPLE_FRACTION', 0)),  # 0.0 - 1.0
+    'sample_interval': 0.005,  # Seconds between stack samples
+    'endpoint': False  # Serve /api/debug/profile/<task_id> even when DEBUG is off
+}
+
 # YouTube downloader settings
 YTDL_OPTIONS = {
     'format': 'bestaudio/best',
@@ -33,5 +48,11 @@ YTDL_OPTIONS = {
 AUDIO_ANALYSIS = {
     'sr': 22050,  # Sample rate for analysis
     'hop_length': 512,  # Hop length for feature extraction
+    'n_fft': 2048,  # FFT size of the shared spectrogram
+    'replaygain_reference': -18.0,  # ReplayGain 2.0 reference loudness (LUFS)
+    'progressive': True,  # Publish a provisional BPM/key while the download continues
+    'progressive_seconds': 60,  # Seconds of audio needed for the provisional analysis
+    'progressive_max_fraction': 0.5,  # Skip it if more of the file than this is already downloaded
+    'progressive_min_eta': 15,  # Skip it if the download should finish sooner than this (seconds)
     'use_cache': True  # Cache analysis results
 }
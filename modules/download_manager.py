@@ -22,6 +22,17 @@ def store_download_info(task_id, info):
             download_tasks[task_id].update(info)
             download_tasks[task_id]['updated_at'] = time.time()
 
+def remove_download_info(task_id, keys):
+    """Remove the given keys from a download task, if present."""
+    with task_lock:
+        task = download_tasks.get(task_id)
+        if not task:
+            return
+        
+        for key in keys:
+            task.pop(key, None)
+        task['updated_at'] = time.time()
+
 def get_download_status(task_id):
     """Get the current status of a download task."""
     with task_lock:
@@ -37,7 +48,7 @@ def get_download_status(task_id):
         }
         
         # Include metadata if available
-        for key in ['artist', 'title', 'bpm', 'key']:
+        for key in ['artist', 'title', 'bpm', 'key', 'provisional', 'features', 'profiled']:
             if key in task:
                 status[key] = task[key]
         
@@ -56,6 +67,15 @@ def get_download_result(task_id):
             'metadata': task.get('metadata', {})
         }
 
+def get_download_profile(task_id):
+    """Get the profile recorded for a task, if it was profiled and has finished."""
+    with task_lock:
+        task = download_tasks.get(task_id)
+        if not task:
+            return None
+        
+        return task.get('profile')
+
 def cleanup_old_tasks():
     """Remove old completed or failed tasks from memory."""
     with task_lock:
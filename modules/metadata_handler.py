@@ -2,6 +2,7 @@ import os
 import tempfile
 import subprocess
 from mutagen.id3 import ID3, TIT2, TPE1, TALB, COMM, TBPM, TKEY
+from .profiler import run_subprocess
 
 def embed_metadata_with_ffmpeg(audio_path, thumbnail_path, metadata, temp_folder):
     """Embed metadata and cover art using FFmpeg (most reliable method)."""
@@ -40,7 +41,7 @@ def embed_metadata_with_ffmpeg(audio_path, thumbnail_path, metadata, temp_folder
     
     try:
         # Execute FFmpeg command
-        subprocess.run(cmd, check=True, capture_output=True)
+        run_subprocess(cmd, check=True, capture_output=True)
         
         if os.path.exists(output_mp3) and os.path.getsize(output_mp3) > 1000:
             return {'final_path': output_mp3, 'success': True}
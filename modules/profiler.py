@@ -0,0 +1,235 @@
+import sys
+import time
+import json
+import pstats
+import marshal
+import cProfile
+import threading
+import subprocess
+from contextlib import contextmanager
+from .config import PROFILING
+
+# Profile of the job running on the current thread, if any
+active_profiles = threading.local()
+
+# From Python 3.12 cProfile hooks sys.monitoring, which is process-wide: it would
+# record every thread rather than the job's, so only the stack sampler is used there
+CPROFILE_PER_THREAD = sys.version_info < (3, 12)
+
+class JobProfile:
+    """Profile of a single download task.
+
+    Records periodic stack samples of the job's thread (plus a cProfile profile
+    where cProfile is per-thread, see CPROFILE_PER_THREAD) and wall times of
+    pipeline stages and subprocesses (see record_timing).
+    """
+
+    def __init__(self, task_id):
+        self.task_id = task_id
+        self.thread_id = None
+        self.started_at = None
+        self.duration = None
+        self.profiler = cProfile.Profile() if CPROFILE_PER_THREAD else None
+        self.cprofile_enabled = False
+        self.stats = None
+        self.timings = []
+        self.stacks = {}
+        self.samples = []
+        self.stop_event = threading.Event()
+        self.sampler = None
+        self.postprocessor_started = None
+
+    def start(self):
+        """Start profiling the calling thread."""
+        self.thread_id = threading.get_ident()
+        self.started_at = time.perf_counter()
+        active_profiles.current = self
+
+        if self.profiler:
+            self.profiler.enable()
+            self.cprofile_enabled = True
+
+        self.sampler = threading.Thread(target=self.sample_loop)
+        self.sampler.daemon = True
+        self.sampler.start()
+
+    def stop(self):
+        """Stop profiling and freeze the collected statistics."""
+        if self.cprofile_enabled:
+            self.profiler.disable()
+            self.stats = pstats.Stats(self.profiler).stats
+        self.profiler = None
+
+        self.stop_event.set()
+        self.sampler.join()
+        self.duration = time.perf_counter() - self.started_at
+        active_profiles.current = None
+
+    def sample_loop(self):
+        """Record the job thread's stack every PROFILING['sample_interval'] seconds."""
+        interval = PROFILING['sample_interval']
+        last = time.perf_counter()
+
+        while not self.stop_event.wait(interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                last = now
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            stack = tuple(reversed(stack))
+
+            stack_id = self.stacks.setdefault(stack, len(self.stacks))
+            self.samples.append((stack_id, now - last))
+            last = now
+
+    def add_timing(self, name, start, end):
+        """Record a wall-time span, relative to the start of the profile."""
+        self.timings.append({
+            'name': name,
+            'start': start - self.started_at,
+            'duration': end - start
+        })
+
+    def summary(self, limit=30):
+        """JSON-serializable overview: timings and the most expensive functions."""
+        functions = []
+        if self.stats:
+            ordered = sorted(self.stats.items(), key=lambda item: item[1][3], reverse=True)
+            for (filename, line, name), (cc, nc, tottime, cumtime, _) in ordered[:limit]:
+                functions.append({
+                    'function': f"{name} ({filename}:{line})",
+                    'calls': nc,
+                    'tottime': round(tottime, 6),
+                    'cumtime': round(cumtime, 6)
+                })
+
+        return {
+            'task_id': self.task_id,
+            'duration': round(self.duration or 0, 6),
+            'cprofile': self.cprofile_enabled,
+            'samples': len(self.samples),
+            'timings': [
+                {**timing, 'start': round(timing['start'], 6), 'duration': round(timing['duration'], 6)}
+                for timing in self.timings
+            ],
+            'functions': functions
+        }
+
+    def to_pstats(self):
+        """cProfile data in the binary format written by pstats.Stats.dump_stats."""
+        return marshal.dumps(self.stats or {})
+
+    def to_collapsed(self):
+        """Folded stacks (one 'a;b;c weight_ms' line per stack) for flamegraph tools."""
+        weights = {}
+        for stack_id, weight in self.samples:
+            weights[stack_id] = weights.get(stack_id, 0) + weight
+
+        lines = []
+        for stack, stack_id in self.stacks.items():
+            if stack_id in weights:
+                names = ';'.join(f"{name} ({filename}:{line})" for name, filename, line in stack)
+                lines.append(f"{names} {int(round(weights[stack_id] * 1000))}")
+        return '\n'.join(lines) + '\n'
+
+    def to_speedscope(self):
+        """speedscope JSON: sampled stacks of the job thread plus a timeline of timed spans."""
+        frames = []
+        frame_ids = {}
+
+        def frame_index(name, filename=None, line=None):
+            key = (name, filename, line)
+            if key not in frame_ids:
+                frame_ids[key] = len(frames)
+                frame = {'name': name}
+                if filename:
+                    frame.update({'file': filename, 'line': line})
+                frames.append(frame)
+            return frame_ids[key]
+
+        stack_frames = {
+            stack_id: [frame_index(*entry) for entry in stack]
+            for stack, stack_id in self.stacks.items()
+        }
+        total = sum(weight for _, weight in self.samples)
+
+        profiles = [{
+            'type': 'sampled',
+            'name': f"Task {self.task_id} (samples)",
+            'unit': 'seconds',
+            'startValue': 0,
+            'endValue': total,
+            'samples': [stack_frames[stack_id] for stack_id, _ in self.samples],
+            'weights': [weight for _, weight in self.samples]
+        }]
+
+        # Spans recorded by record_timing are properly nested, so they form an evented profile.
+        # On ties, closes come before opens, outer spans open first and inner spans close first.
+        events = []
+        for timing in self.timings:
+            if timing['duration'] <= 0:
+                continue
+            index = frame_index(timing['name'])
+            end = timing['start'] + timing['duration']
+            events.append(((timing['start'], 1, -timing['duration']), {'type': 'O', 'frame': index, 'at': timing['start']}))
+            events.append(((end, 0, timing['duration']), {'type': 'C', 'frame': index, 'at': end}))
+        events = [event for _, event in sorted(events, key=lambda item: item[0])]
+        if events:
+            profiles.append({
+                'type': 'evented',
+                'name': f"Task {self.task_id} (stages and subprocesses)",
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': max(self.duration or 0, events[-1]['at']),
+                'events': events
+            })
+
+        return json.dumps({
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': f"Task {self.task_id}",
+            'exporter': 'dj-downloader-pro',
+            'shared': {'frames': frames},
+            'profiles': profiles
+        })
+
+def current_profile():
+    """Profile of the job running on this thread, or None."""
+    return getattr(active_profiles, 'current', None)
+
+@contextmanager
+def record_timing(name):
+    """Time a block as a named span if the current thread is being profiled."""
+    profile = current_profile()
+    if profile is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_timing(name, start, time.perf_counter())
+
+def run_subprocess(cmd, **kwargs):
+    """subprocess.run, with its wall time recorded on the current profile."""
+    with record_timing(f"subprocess: {cmd[0]}"):
+        return subprocess.run(cmd, **kwargs)
+
+def ytdlp_postprocessor_hook(progress):
+    """yt-dlp postprocessor hook timing postprocessors (e.g. the FFmpeg audio extraction)."""
+    profile = current_profile()
+    if profile is None:
+        return
+
+    name = f"yt-dlp postprocessor: {progress.get('postprocessor')}"
+    if progress.get('status') == 'started':
+        profile.postprocessor_started = time.perf_counter()
+    elif progress.get('status') == 'finished' and profile.postprocessor_started is not None:
+        profile.add_timing(name, profile.postprocessor_started, time.perf_counter())
+        profile.postprocessor_started = None
@@ -1,12 +1,15 @@
 from flask import request, jsonify, make_response, render_template
 import uuid
 import os
+import random
 import threading
 import logging
-from .youtube_downloader import download_from_youtube
+from .youtube_downloader import download_from_youtube, parse_video_title
 from .audio_analyzer import analyze_audio_file
+from .config import AUDIO_ANALYSIS, PROFILING
 from .metadata_handler import process_audio_metadata
-from .download_manager import get_download_status, store_download_info, get_download_result
+from .download_manager import get_download_status, store_download_info, remove_download_info, get_download_result, get_download_profile
+from .profiler import JobProfile, record_timing
 
 # Configure logging
 logging.basicConfig(
@@ -42,18 +45,24 @@ def register_routes(app):
         # Generate a unique task ID
         task_id = str(uuid.uuid4())
         
+        # Profile on request, or for a sampled fraction of jobs
+        profile = request.form.get('profile', '').lower() in ('1', 'true', 'yes')
+        if not profile and PROFILING['sample_fraction'] > 0:
+            profile = random.random() < PROFILING['sample_fraction']
+        
         # Store initial task status
         store_download_info(task_id, {
             'status': 'queued',
             'url': url,
             'progress': 0,
-            'message': 'Download queued'
+            'message': 'Download queued',
+            'profiled': profile
         })
         
         # Start download process in background thread
         thread = threading.Thread(
             target=process_download_task,
-            args=(app, task_id, url)
+            args=(app, task_id, url, profile)
         )
         thread.daemon = True
         thread.start()
@@ -95,6 +104,41 @@ def register_routes(app):
         
         logger.info(f"Serving download for task: {task_id}, file: {result['filename']}")
         return response
+    
+    @app.route('/api/debug/profile/<task_id>', methods=['GET'])
+    def get_profile(task_id):
+        """Get the profile of a finished, profiled task.
+        
+        ?format= summary (default, JSON), pstats (binary, for pstats/snakeviz),
+        speedscope (JSON) or collapsed (folded stacks for flamegraph tools).
+        """
+        if not (app.config['DEBUG'] or PROFILING['endpoint']):
+            return jsonify({'error': 'Resource not found'}), 404
+        
+        profile = get_download_profile(task_id)
+        if not profile:
+            return jsonify({'error': 'Profile not found or task not finished'}), 404
+        
+        output_format = request.args.get('format', 'summary')
+        if output_format == 'summary':
+            return jsonify(profile.summary())
+        elif output_format == 'pstats':
+            if not profile.cprofile_enabled:
+                return jsonify({'error': 'No cProfile data for this task; use speedscope or collapsed'}), 404
+            response = make_response(profile.to_pstats())
+            response.headers["Content-Type"] = "application/octet-stream"
+            response.headers["Content-Disposition"] = f'attachment; filename="{task_id}.prof"'
+        elif output_format == 'speedscope':
+            response = make_response(profile.to_speedscope())
+            response.headers["Content-Type"] = "application/json"
+            response.headers["Content-Disposition"] = f'attachment; filename="{task_id}.speedscope.json"'
+        elif output_format == 'collapsed':
+            response = make_response(profile.to_collapsed())
+            response.headers["Content-Type"] = "text/plain"
+        else:
+            return jsonify({'error': f'Unknown format: {output_format}'}), 400
+        
+        return response
         
     @app.errorhandler(404)
     def not_found_error(error):
@@ -106,10 +150,124 @@ def register_routes(app):
         logger.error(f"500 error: {str(error)}")
         return jsonify({'error': 'Internal server error'}), 500
 
-def process_download_task(app, task_id, url):
+class ProvisionalAnalysis:
+    """Publish an early BPM/key estimate while a download is still running.
+    
+    hook() is registered as a yt-dlp progress hook. Once enough seconds of
+    audio are on disk, a snapshot of the partial file is analyzed on a separate
+    thread and stored on the task with provisional=True. Downloads that are
+    about to finish anyway are skipped, as the provisional analysis would only
+    compete with the full one for CPU. finalize() stops any late provisional
+    result from overwriting the full analysis, discard() also removes one
+    already stored when the task fails.
+    """
+    
+    def __init__(self, task_id, logger):
+        self.task_id = task_id
+        self.logger = logger
+        self.min_seconds = AUDIO_ANALYSIS['progressive_seconds']
+        self.started = False
+        self.published = False
+        self.final = False
+        self.lock = threading.Lock()
+    
+    def hook(self, progress):
+        """yt-dlp progress hook; must never raise, or the download is aborted."""
+        if self.started or progress.get('status') != 'downloading':
+            return
+        
+        try:
+            info = progress.get('info_dict') or {}
+            total = progress.get('total_bytes') or progress.get('total_bytes_estimate')
+            downloaded = progress.get('downloaded_bytes') or 0
+            partial_path = progress.get('tmpfilename')
+            if not (total and info.get('duration') and partial_path):
+                return
+            
+            # Estimate how many seconds of audio the partial file holds
+            if downloaded / total * info['duration'] < self.min_seconds:
+                return
+            self.started = True
+            
+            # Not worth it if the full file will be there shortly
+            eta = progress.get('eta')
+            if downloaded / total > AUDIO_ANALYSIS['progressive_max_fraction']:
+                return
+            if eta is not None and eta < AUDIO_ANALYSIS['progressive_min_eta']:
+                return
+            
+            # Snapshot the bytes written so far; the partial file keeps growing and is renamed when done
+            snapshot_path = f"{partial_path}.preview"
+            with open(partial_path, 'rb') as src, open(snapshot_path, 'wb') as dst:
+                dst.write(src.read(downloaded))
+            
+            thread = threading.Thread(target=self.analyze, args=(snapshot_path, info))
+            thread.daemon = True
+            thread.start()
+        
+        except Exception as e:
+            self.logger.warning(f"Could not start provisional analysis: {str(e)}")
+    
+    def analyze(self, snapshot_path, info):
+        """Analyze the snapshot and store the provisional result."""
+        try:
+            result = analyze_audio_file(snapshot_path, duration=self.min_seconds)
+        finally:
+            if os.path.exists(snapshot_path):
+                os.remove(snapshot_path)
+        
+        if not result['bpm']:
+            return
+        
+        artist, title = parse_video_title(
+            info.get('title', 'Unknown Title'),
+            info.get('uploader', 'Unknown Artist')
+        )
+        
+        with self.lock:
+            if self.final:
+                return
+            store_download_info(self.task_id, {
+                'artist': artist,
+                'title': title,
+                'bpm': result['bpm'],
+                'key': result['key'],
+                'provisional': True
+            })
+            self.published = True
+        self.logger.info(f"Provisional analysis: BPM={result['bpm']}, Key={result['key']}")
+    
+    def finalize(self):
+        """Mark the full analysis as done so provisional results are discarded."""
+        with self.lock:
+            self.final = True
+    
+    def discard(self):
+        """Stop provisional results and remove any not yet replaced by the full analysis."""
+        with self.lock:
+            if self.published and not self.final:
+                remove_download_info(self.task_id, ['bpm', 'key', 'provisional'])
+            self.final = True
+
+def finish_profile(job_profile, logger):
+    """Stop a task's profile and return it as task info, to be stored with the final status."""
+    if not job_profile or job_profile.duration is not None:
+        return {}
+    
+    job_profile.stop()
+    logger.info(f"Profile recorded: {job_profile.duration:.1f}s, {len(job_profile.samples)} samples")
+    return {'profile': job_profile}
+
+def process_download_task(app, task_id, url, profile=False):
     """Process a download task in the background."""
     logger = logging.getLogger(f"task_{task_id}")
     
+    job_profile = JobProfile(task_id) if profile else None
+    if job_profile:
+        job_profile.start()
+    
+    provisional = ProvisionalAnalysis(task_id, logger)
+    
     try:
         logger.info(f"Starting task processing for URL: {url}")
         
@@ -120,9 +278,13 @@ def process_download_task(app, task_id, url):
             'message': 'Downloading audio from YouTube...'
         })
         
-        # Download from YouTube
+        # Download from YouTube, analyzing the first seconds early if enabled
         logger.info("Downloading from YouTube...")
-        download_result = download_from_youtube(url, app.config['TEMP_FOLDER'])
+        download_result = download_from_youtube(
+            url,
+            app.config['TEMP_FOLDER'],
+            progress_hook=provisional.hook if AUDIO_ANALYSIS['progressive'] else None
+        )
         
         # Update status to analyzing
         logger.info("Download complete, starting audio analysis...")
@@ -136,7 +298,9 @@ def process_download_task(app, task_id, url):
         
         # Analyze audio
         audio_path = download_result['audio_path']
-        analysis_result = analyze_audio_file(audio_path)
+        with record_timing('analyze_audio_file'):
+            analysis_result = analyze_audio_file(audio_path)
+        provisional.finalize()
         logger.info(f"Audio analysis complete: BPM={analysis_result['bpm']}, Key={analysis_result['key']}")
         
         # Update status to processing
@@ -145,20 +309,23 @@ def process_download_task(app, task_id, url):
             'progress': 75,
             'message': 'Processing metadata and finalizing...',
             'bpm': analysis_result['bpm'],
-            'key': analysis_result['key']
+            'key': analysis_result['key'],
+            'provisional': False,
+            'features': analysis_result['features']
         })
         
         # Process metadata and prepare final file
-        final_result = process_audio_metadata(
-            audio_path,
-            download_result.get('thumbnail_path'),
-            {
-                'artist': download_result['artist'],
-                'title': download_result['title'],
-                'bpm': analysis_result['bpm'],
-                'key': analysis_result['key'],
-            }
-        )
+        with record_timing('process_audio_metadata'):
+            final_result = process_audio_metadata(
+                audio_path,
+                download_result.get('thumbnail_path'),
+                {
+                    'artist': download_result['artist'],
+                    'title': download_result['title'],
+                    'bpm': analysis_result['bpm'],
+                    'key': analysis_result['key'],
+                }
+            )
         
         # Read file into memory
         with open(final_result['final_path'], 'rb') as f:
@@ -169,7 +336,7 @@ def process_download_task(app, task_id, url):
         if os.path.exists(download_result.get('thumbnail_path', '')):
             os.remove(download_result['thumbnail_path'])
         
-        # Store result for download
+        # Store result for download, with the profile so it is available as soon as the task completes
         store_download_info(task_id, {
             'status': 'completed',
             'progress': 100,
@@ -182,7 +349,8 @@ def process_download_task(app, task_id, url):
                 'Bpm': analysis_result['bpm'],
                 'Key': analysis_result['key'],
                 'Has-Cover': 'true' if download_result.get('has_thumbnail', False) else 'false'
-            }
+            },
+            **finish_profile(job_profile, logger)
         })
         
         # Send download success notification
@@ -192,13 +360,21 @@ def process_download_task(app, task_id, url):
         })
     
     except Exception as e:
-        # Update status to error
+        # Drop the provisional BPM/key and stop a still-running analysis from writing onto the failed task
+        provisional.discard()
+        
+        # Update status to error, keeping the profile of failed jobs too
         store_download_info(task_id, {
             'status': 'error',
             'progress': 0,
-            'message': f'Error: {str(e)}'
+            'message': f'Error: {str(e)}',
+            **finish_profile(job_profile, logger)
         })
         logger.error(f"Error processing task {task_id}: {str(e)}")
+    
+    finally:
+        # Never leave the sampler running, even if neither final status was stored
+        finish_profile(job_profile, logger)
 
 def send_download_success_notification(track_info):
     """
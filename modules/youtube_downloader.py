@@ -3,7 +3,8 @@ import re
 import yt_dlp
 import requests
 import tempfile
-from .config import YTDL_OPTIONS
+from .config import YTDL_OPTIONS, MEDIA_SOURCES
+from .profiler import record_timing, ytdlp_postprocessor_hook
 
 def extract_youtube_id(url):
     """Extract YouTube video ID from URL."""
@@ -15,11 +16,12 @@ def download_thumbnail(video_id, output_path):
     if not video_id:
         return None, False
     
+    base_url = MEDIA_SOURCES['thumbnail_base_url'].rstrip('/')
     thumbnail_urls = [
-        f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg",
-        f"https://img.youtube.com/vi/{video_id}/sddefault.jpg",
-        f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg",
-        f"https://img.youtube.com/vi/{video_id}/0.jpg"
+        f"{base_url}/{video_id}/maxresdefault.jpg",
+        f"{base_url}/{video_id}/sddefault.jpg",
+        f"{base_url}/{video_id}/hqdefault.jpg",
+        f"{base_url}/{video_id}/0.jpg"
     ]
     
     for thumbnail_url in thumbnail_urls:
@@ -46,8 +48,18 @@ def parse_video_title(title, uploader):
     
     return artist, track_title
 
-def download_from_youtube(url, temp_folder):
-    """Download audio from YouTube and return metadata."""
+def resolve_source_url(url, video_id):
+    """Map a YouTube URL to the configured video source, if one is set."""
+    template = MEDIA_SOURCES['video_url_template']
+    if template and video_id:
+        return template.format(video_id=video_id)
+    return url
+
+def download_from_youtube(url, temp_folder, progress_hook=None):
+    """Download audio from YouTube and return metadata.
+    
+    progress_hook, if given, is registered as a yt-dlp progress hook.
+    """
     video_id = extract_youtube_id(url)
     
     # Create temporary files
@@ -62,15 +74,19 @@ def download_from_youtube(url, temp_folder):
     thumbnail_path = os.path.join(temp_folder, f"{video_id}_thumbnail.jpg")
     
     # Download thumbnail
-    thumbnail_result, has_thumbnail = download_thumbnail(video_id, thumbnail_path)
+    with record_timing('download_thumbnail'):
+        thumbnail_result, has_thumbnail = download_thumbnail(video_id, thumbnail_path)
     
     # Configure yt-dlp
     options = YTDL_OPTIONS.copy()
     options['outtmpl'] = audio_path
+    options['postprocessor_hooks'] = [ytdlp_postprocessor_hook]
+    if progress_hook:
+        options['progress_hooks'] = [progress_hook]
     
     # Download audio
-    with yt_dlp.YoutubeDL(options) as ydl:
-        info = ydl.extract_info(url, download=True)
+    with yt_dlp.YoutubeDL(options) as ydl, record_timing('yt-dlp extract_info'):
+        info = ydl.extract_info(resolve_source_url(url, video_id), download=True)
     
     # Find the actual MP3 file path (in case yt-dlp added extensions)
     base, _ = os.path.splitext(audio_path)
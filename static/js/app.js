@@ -162,13 +162,14 @@ async function pollDownloadStatus(taskId) {
                 analyzingNotified = true;
             }
             
-            // If we have track info, update the UI
+            // If we have track info, update the UI (provisional values are marked with ~)
             if (status.artist && status.title) {
+                const mark = status.provisional ? '~' : '';
                 updateTrackInfo({
                     artist: status.artist,
                     title: status.title,
-                    bpm: status.bpm || '0',
-                    key: status.key || 'Unknown'
+                    bpm: status.bpm ? `${mark}${status.bpm}` : '0',
+                    key: status.key ? `${mark}${status.key}` : 'Unknown'
                 });
             }
             
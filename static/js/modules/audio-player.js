@@ -2,11 +2,12 @@
  * Audio Player Module - Handles audio playback and waveform visualization
  */
 
-import { initVisualizer, drawWaveform, drawBeatGrid, drawHotCueMarker, updatePlayhead as updateVisualizerPlayhead } from './audio-visualizer.js';
+import { initVisualizer, loadWaveform, clearWaveform, resizeWaveform, zoomWaveform, timeAtPosition, drawBeatGrid, drawHotCueMarker, updatePlayhead as updateVisualizerPlayhead } from './audio-visualizer.js';
 
 // Global variables
 let audioContext;
-let audioBuffer;
+let trackDuration = 0;
+let energyEnvelope = null; // Mean amplitude envelope kept instead of the decoded PCM
 let isPlaying = false;
 let hotCues = [];
 let bpmValue = 0;
@@ -70,13 +71,24 @@ function attachEventListeners() {
     
     if (waveformContainer) {
         waveformContainer.addEventListener('click', (e) => {
-            if (!audioBuffer) return;
+            if (!trackDuration) return;
             const rect = waveformContainer.getBoundingClientRect();
             const clickPosition = (e.clientX - rect.left) / rect.width;
-            const seekTime = clickPosition * audioBuffer.duration;
+            const seekTime = timeAtPosition(visualizer, clickPosition);
             audioPlayer.currentTime = seekTime;
             updatePlayhead();
         });
+        
+        // Zoom around the cursor; only the visible region is redrawn
+        waveformContainer.addEventListener('wheel', (e) => {
+            if (!trackDuration) return;
+            e.preventDefault();
+            const rect = waveformContainer.getBoundingClientRect();
+            const anchor = (e.clientX - rect.left) / rect.width;
+            zoomWaveform(visualizer, e.deltaY > 0 ? 1.25 : 0.8, anchor);
+            redrawHotCueMarkers();
+            updatePlayhead();
+        }, { passive: false });
     }
     
     // Update playhead during playback
@@ -112,20 +124,24 @@ export function loadAudio(audioData) {
             .then(response => response.arrayBuffer())
             .then(buffer => audioContext.decodeAudioData(buffer))
             .then(decodedBuffer => {
-                audioBuffer = decodedBuffer;
-                
-                if (waveformContainer && visualizer) {
-                    visualizer.waveformCanvas.width = waveformContainer.offsetWidth;
-                    visualizer.waveformCanvas.height = waveformContainer.offsetHeight;
-                    
-                    // Draw waveform using the visualizer
-                    drawWaveform(audioBuffer, visualizer.waveformCtx, visualizer.waveformCanvas);
+                if (waveformContainer) {
+                    resizeWaveform(visualizer, waveformContainer.offsetWidth, waveformContainer.offsetHeight);
                 }
                 
+                // Peaks are computed and drawn in the worker; the decoded PCM is not kept
+                return loadWaveform(visualizer, decodedBuffer);
+            })
+            .then(envelope => {
+                // A newer track replaced this one before its peaks were ready
+                if (!envelope) return;
+                
+                energyEnvelope = envelope;
+                trackDuration = envelope.duration;
+                
                 bpmValue = parseInt(document.getElementById('song-bpm')?.textContent || '0');
-                if (bpmValue && beatGridContainer) {
+                if (bpmValue) {
                     // Draw beat grid using the visualizer
-                    drawBeatGrid(bpmValue, audioBuffer.duration, beatGridContainer);
+                    drawBeatGrid(bpmValue, visualizer);
                 }
                 
                 // Setup download button
@@ -136,6 +152,9 @@ export function loadAudio(audioData) {
     
     // Reset playback state
     isPlaying = false;
+    trackDuration = 0;
+    energyEnvelope = null;
+    clearWaveform(visualizer);
     
     // Clear hot cues array
     hotCues = [];
@@ -185,7 +204,7 @@ function setupDownloadButton(audioUrl) {
  * Toggle play/pause state
  */
 function togglePlayPause() {
-    if (!audioBuffer) return;
+    if (!trackDuration) return;
     
     if (isPlaying) {
         audioPlayer.pause();
@@ -223,12 +242,12 @@ function updatePlayPauseButton() {
  * Update the playhead position
  */
 function updatePlayhead() {
-    if (!audioBuffer || !playhead || !currentTimeDisplay) return;
+    if (!trackDuration || !playhead || !currentTimeDisplay) return;
     
     const currentTime = audioPlayer.currentTime;
     
     // Update playhead using visualizer
-    updateVisualizerPlayhead(currentTime, audioBuffer.duration, playhead);
+    updateVisualizerPlayhead(currentTime, visualizer, playhead);
     
     // Update time display
     currentTimeDisplay.textContent = formatTime(currentTime);
@@ -246,8 +265,8 @@ function createHotCue(time, name) {
     hotCues.push(cue);
     
     // Draw using visualizer
-    if (audioBuffer) {
-        drawHotCueMarker(cue, audioBuffer.duration, hotCuesContainer);
+    if (trackDuration) {
+        drawHotCueMarker(cue, visualizer, hotCuesContainer);
     }
     
     updateHotCuesList();
@@ -258,11 +277,11 @@ function createHotCue(time, name) {
  * Redraw all hot cue markers
  */
 function redrawHotCueMarkers() {
-    if (!hotCuesContainer || !audioBuffer) return;
+    if (!hotCuesContainer || !trackDuration) return;
     
     hotCuesContainer.innerHTML = '';
     hotCues.forEach(cue => {
-        drawHotCueMarker(cue, audioBuffer.duration, hotCuesContainer);
+        drawHotCueMarker(cue, visualizer, hotCuesContainer);
     });
 }
 
@@ -340,7 +359,7 @@ function exportCuesToRekordbox() {
     xmlContent += '<DJ_PLAYLISTS Version="1.0.0">\n';
     xmlContent += '  <PRODUCT Name="rekordbox" Version="6.0.0" Company="Pioneer DJ"/>\n';
     xmlContent += '  <COLLECTION Entries="1">\n';
-    xmlContent += `    <TRACK Artist="${artist}" Title="${title}" Kind="MP3 File" BPM="${bpm}" Key="${key}" TotalTime="${formatTime(audioBuffer.duration)}">\n`;
+    xmlContent += `    <TRACK Artist="${artist}" Title="${title}" Kind="MP3 File" BPM="${bpm}" Key="${key}" TotalTime="${formatTime(trackDuration)}">\n`;
     
     hotCues.forEach(cue => {
         const timeMs = Math.floor(cue.time * 1000);
@@ -366,13 +385,10 @@ function exportCuesToRekordbox() {
  * Handle window resize event
  */
 function handleResize() {
-    if (!audioBuffer || !waveformContainer || !visualizer) return;
-    
-    visualizer.waveformCanvas.width = waveformContainer.offsetWidth;
-    visualizer.waveformCanvas.height = waveformContainer.offsetHeight;
+    if (!trackDuration || !waveformContainer || !visualizer) return;
     
-    drawWaveform(audioBuffer, visualizer.waveformCtx, visualizer.waveformCanvas);
-    drawBeatGrid(bpmValue, audioBuffer.duration, beatGridContainer);
+    // The worker redraws the waveform and beat grid at the new size
+    resizeWaveform(visualizer, waveformContainer.offsetWidth, waveformContainer.offsetHeight);
     redrawHotCueMarkers();
 }
 
@@ -397,7 +413,7 @@ function formatTime(seconds) {
  * @returns {Array} - Array of created cue IDs
  */
 export function autoSetHotCues(config = {}) {
-    if (!audioBuffer) {
+    if (!trackDuration) {
         console.error("No audio loaded. Cannot set auto cues.");
         return [];
     }
@@ -445,7 +461,7 @@ export function autoSetHotCues(config = {}) {
     }
     
     // Duration in seconds
-    const duration = audioBuffer.duration;
+    const duration = trackDuration;
     
     // Calculate beats and bars
     const beatsPerSecond = bpm / 60;
@@ -458,7 +474,7 @@ export function autoSetHotCues(config = {}) {
     const totalPhrases = Math.floor(duration / secondsPerPhrase);
     
     // Audio analysis for detecting drops and transitions
-    const dropPositions = detectDrops(audioBuffer, bpm, genre);
+    const dropPositions = detectDrops(energyEnvelope, bpm, genre);
     
     // Store created cue IDs
     const createdCueIds = [];
@@ -515,15 +531,15 @@ export function autoSetHotCues(config = {}) {
 /**
  * Detect drops in the audio by analyzing amplitude changes
  * 
- * @param {AudioBuffer} buffer - The audio buffer to analyze
+ * @param {Object} envelope - Energy envelope { duration, energy, rate } from the waveform worker
  * @param {number} bpm - Beats per minute
  * @param {string} genre - Music genre
  * @returns {Array} - Array of drop positions in seconds
  */
-function detectDrops(buffer, bpm, genre) {
-    // Get audio data from the first channel
-    const audioData = buffer.getChannelData(0);
-    const sampleRate = buffer.sampleRate;
+function detectDrops(envelope, bpm, genre) {
+    // Mean amplitude per envelope point, `rate` points per second
+    const audioData = envelope.energy;
+    const sampleRate = envelope.rate;
     
     // Calculate basic audio parameters
     const secondsPerBeat = 60 / bpm;
@@ -538,7 +554,7 @@ function detectDrops(buffer, bpm, genre) {
             let sum = 0;
             const end = Math.min(startSample + windowSize, audioData.length);
             for (let i = startSample; i < end; i++) {
-                sum += Math.abs(audioData[i]);
+                sum += audioData[i];
             }
             return sum / windowSize;
         };
@@ -581,11 +597,11 @@ function detectDrops(buffer, bpm, genre) {
             const secondDropTime = secondDropBar * beatsPerBar * secondsPerBeat;
             
             // Only add drops that are within the track duration
-            if (firstDropTime < buffer.duration) {
+            if (firstDropTime < envelope.duration) {
                 dropPositions.push(firstDropTime);
             }
             
-            if (secondDropTime < buffer.duration) {
+            if (secondDropTime < envelope.duration) {
                 dropPositions.push(secondDropTime);
             }
         }
@@ -1,125 +1,234 @@
 /**
  * Audio Visualizer Module - Handles waveform and beat grid visualization
+ *
+ * Peak computation and drawing run in a Web Worker (workers/waveform-worker.js)
+ * that renders into an OffscreenCanvas. The decoded PCM is handed to the worker
+ * once and only the peak pyramid is kept, so zooming redraws just the visible
+ * region from the matching level of detail.
  */
 
+import { paintFrame } from './waveform-renderer.js';
+
+// Shortest visible region when zoomed in, in seconds
+const MIN_VIEW_SPAN = 1;
+
 /**
  * Initialize the audio visualizer
  * @param {Object} containers - Object containing DOM containers for visualization elements
+ * @returns {Object} Visualizer state passed to the other functions of this module
  */
 export function initVisualizer(containers) {
-    const { waveformContainer, beatGridContainer, hotCuesContainer } = containers;
-    
+    const { waveformContainer } = containers;
+
     // Create waveform canvas
     const waveformCanvas = document.createElement('canvas');
     waveformCanvas.id = 'waveform-canvas';
     if (waveformContainer) {
         waveformContainer.appendChild(waveformCanvas);
     }
-    
-    return {
+
+    const visualizer = {
         waveformCanvas,
-        waveformCtx: waveformCanvas.getContext('2d')
+        fallbackCtx: null,
+        worker: new Worker(new URL('../workers/waveform-worker.js', import.meta.url), { type: 'module' }),
+        duration: 0,
+        view: { start: 0, end: 0 },
+        loadId: 0,
+        pendingLoad: null
     };
+
+    // Hand the canvas to the worker; without OffscreenCanvas the worker returns columns to paint here
+    if (waveformCanvas.transferControlToOffscreen) {
+        const offscreen = waveformCanvas.transferControlToOffscreen();
+        visualizer.worker.postMessage({ type: 'canvas', canvas: offscreen }, [offscreen]);
+    } else {
+        visualizer.fallbackCtx = waveformCanvas.getContext('2d');
+    }
+
+    visualizer.worker.onmessage = (event) => handleWorkerMessage(visualizer, event.data);
+
+    return visualizer;
+}
+
+/**
+ * Handle a message from the waveform worker
+ * @param {Object} visualizer - Visualizer state
+ * @param {Object} message - Worker message
+ */
+function handleWorkerMessage(visualizer, message) {
+    if (message.type === 'loaded') {
+        // Ignore replies for tracks that were replaced or cleared in the meantime
+        if (message.loadId !== visualizer.loadId) return;
+
+        visualizer.duration = message.duration;
+        visualizer.view = { start: 0, end: message.duration };
+        settlePendingLoad(visualizer, {
+            duration: message.duration,
+            energy: message.energy,
+            rate: message.energyRate
+        });
+    } else if (message.type === 'frame' && visualizer.fallbackCtx) {
+        paintFrame(visualizer.fallbackCtx, message);
+    }
+}
+
+/**
+ * Resolve the outstanding load, if any
+ * @param {Object} visualizer - Visualizer state
+ * @param {Object|null} envelope - Energy envelope, or null if the load was superseded
+ */
+function settlePendingLoad(visualizer, envelope) {
+    if (visualizer.pendingLoad) {
+        visualizer.pendingLoad(envelope);
+        visualizer.pendingLoad = null;
+    }
+}
+
+/**
+ * Send decoded audio to the worker for peak computation
+ * Channel data is copied into a transferable buffer, so the caller can release
+ * the AudioBuffer as soon as this returns.
+ * @param {Object} visualizer - Visualizer state
+ * @param {AudioBuffer} buffer - Decoded audio
+ * @returns {Promise<Object|null>} Resolves to the energy envelope { duration, energy, rate },
+ *     or to null if another track is loaded or the waveform is cleared first
+ */
+export function loadWaveform(visualizer, buffer) {
+    const samples = new Float32Array(buffer.length);
+    buffer.copyFromChannel(samples, 0);
+
+    settlePendingLoad(visualizer, null);
+    const loadId = ++visualizer.loadId;
+
+    return new Promise(resolve => {
+        visualizer.pendingLoad = resolve;
+        visualizer.worker.postMessage({
+            type: 'load',
+            loadId,
+            samples,
+            sampleRate: buffer.sampleRate
+        }, [samples.buffer]);
+    });
 }
 
 /**
- * Draw waveform from audio buffer
- * @param {AudioBuffer} buffer - Audio buffer to visualize
- * @param {Object} canvasContext - Canvas 2D context
- * @param {HTMLCanvasElement} canvas - Canvas element
+ * Clear the waveform and forget the current track
+ * @param {Object} visualizer - Visualizer state
  */
-export function drawWaveform(buffer, canvasContext, canvas) {
-    if (!canvasContext) return;
-    
-    const width = canvas.width;
-    const height = canvas.height;
-    const channelData = buffer.getChannelData(0);
-    const step = Math.ceil(channelData.length / width);
-
-    canvasContext.clearRect(0, 0, width, height);
-
-    for (let i = 0; i < width; i++) {
-        const start = Math.floor(i * step);
-        const end = Math.floor((i + 1) * step);
-        let min = channelData[start];
-        let max = channelData[start];
-
-        for (let j = start; j < end; j++) {
-            if (channelData[j] < min) min = channelData[j];
-            if (channelData[j] > max) max = channelData[j];
-        }
-
-        const y = height / 2;
-        const amplitude = Math.max(Math.abs(min), Math.abs(max));
-
-        const gradient = canvasContext.createLinearGradient(0, y - height / 2 * amplitude, 0, y + height / 2 * amplitude);
-        gradient.addColorStop(0, 'rgba(52, 152, 219, 0.8)');
-        gradient.addColorStop(0.5, 'rgba(52, 152, 219, 0.5)');
-        gradient.addColorStop(1, 'rgba(52, 152, 219, 0.8)');
-
-        canvasContext.fillStyle = gradient;
-        canvasContext.fillRect(i, y - height / 2 * amplitude, 1, height * amplitude);
+export function clearWaveform(visualizer) {
+    visualizer.loadId++;
+    settlePendingLoad(visualizer, null);
+    visualizer.duration = 0;
+    visualizer.view = { start: 0, end: 0 };
+    visualizer.worker.postMessage({ type: 'clear' });
+}
+
+/**
+ * Resize the waveform canvas
+ * @param {Object} visualizer - Visualizer state
+ * @param {number} width - Width in CSS pixels
+ * @param {number} height - Height in CSS pixels
+ */
+export function resizeWaveform(visualizer, width, height) {
+    // A canvas transferred to the worker can only be resized there
+    if (visualizer.fallbackCtx) {
+        visualizer.waveformCanvas.width = width;
+        visualizer.waveformCanvas.height = height;
     }
+    visualizer.worker.postMessage({ type: 'resize', width, height });
+}
+
+/**
+ * Set the visible region of the waveform
+ * @param {Object} visualizer - Visualizer state
+ * @param {number} start - Start time in seconds
+ * @param {number} end - End time in seconds
+ */
+export function setWaveformView(visualizer, start, end) {
+    const duration = visualizer.duration;
+    if (!duration) return;
+
+    const span = Math.min(duration, Math.max(MIN_VIEW_SPAN, end - start));
+    start = Math.min(Math.max(0, start), duration - span);
+
+    visualizer.view = { start, end: start + span };
+    visualizer.worker.postMessage({ type: 'view', ...visualizer.view });
+}
+
+/**
+ * Zoom the waveform around a point
+ * @param {Object} visualizer - Visualizer state
+ * @param {number} factor - Span multiplier (< 1 zooms in, > 1 zooms out)
+ * @param {number} anchor - Position of the zoom centre as a fraction of the canvas width
+ */
+export function zoomWaveform(visualizer, factor, anchor) {
+    const { start, end } = visualizer.view;
+    const anchorTime = timeAtPosition(visualizer, anchor);
+    const span = (end - start) * factor;
+    setWaveformView(visualizer, anchorTime - anchor * span, anchorTime + (1 - anchor) * span);
+}
+
+/**
+ * Convert a horizontal position on the waveform to a track time
+ * @param {Object} visualizer - Visualizer state
+ * @param {number} fraction - Position as a fraction of the canvas width
+ * @returns {number} Time in seconds
+ */
+export function timeAtPosition(visualizer, fraction) {
+    const { start, end } = visualizer.view;
+    return start + fraction * (end - start);
+}
+
+/**
+ * Convert a track time to a left offset within the visible region
+ * @param {Object} visualizer - Visualizer state
+ * @param {number} time - Time in seconds
+ * @returns {number|null} Position in percent, or null if outside the visible region
+ */
+function positionOfTime(visualizer, time) {
+    const { start, end } = visualizer.view;
+    if (end <= start || time < start || time > end) return null;
+    return ((time - start) / (end - start)) * 100;
 }
 
 /**
  * Draw beat grid based on BPM
  * @param {number} bpm - Beats per minute
- * @param {number} duration - Track duration in seconds
- * @param {HTMLElement} container - Container for beat markers
+ * @param {Object} visualizer - Visualizer state
  */
-export function drawBeatGrid(bpm, duration, container) {
-    if (!container || !bpm || bpm <= 0) return;
-    
-    container.innerHTML = '';
-
-    const beatsPerSecond = bpm / 60;
-    const totalBeats = Math.floor(beatsPerSecond * duration);
-
-    for (let i = 0; i < totalBeats; i++) {
-        const beatMarker = document.createElement('div');
-        beatMarker.className = 'beat-marker';
-        const beatTime = i / beatsPerSecond;
-        const position = (beatTime / duration) * 100;
-        beatMarker.style.left = `${position}%`;
-
-        // Highlight every 4th beat (1st beat of each bar)
-        if (i % 4 === 0) {
-            beatMarker.style.backgroundColor = 'rgba(255, 255, 255, 0.4)';
-            beatMarker.style.width = '2px';
-        }
-
-        container.appendChild(beatMarker);
-    }
+export function drawBeatGrid(bpm, visualizer) {
+    visualizer.worker.postMessage({ type: 'beatgrid', bpm: bpm > 0 ? bpm : 0 });
 }
 
 /**
  * Draw a hot cue marker
  * @param {Object} cue - Hot cue object
- * @param {number} duration - Track duration in seconds
+ * @param {Object} visualizer - Visualizer state
  * @param {HTMLElement} container - Container for hot cue markers
  */
-export function drawHotCueMarker(cue, duration, container) {
+export function drawHotCueMarker(cue, visualizer, container) {
     if (!container) return;
-    
-    const position = (cue.time / duration) * 100;
+
+    const position = positionOfTime(visualizer, cue.time);
     const marker = document.createElement('div');
     marker.className = 'hot-cue-marker';
     marker.setAttribute('data-cue', cue.name);
     marker.setAttribute('data-id', cue.id);
-    marker.style.left = `${position}%`;
+    marker.style.left = `${position || 0}%`;
+    marker.style.display = position === null ? 'none' : '';
     container.appendChild(marker);
 }
 
 /**
  * Update playhead position
  * @param {number} currentTime - Current playback time
- * @param {number} duration - Total track duration
+ * @param {Object} visualizer - Visualizer state
  * @param {HTMLElement} playhead - Playhead DOM element
  */
-export function updatePlayhead(currentTime, duration, playhead) {
-    if (!playhead || !duration) return;
-    
-    const position = (currentTime / duration) * 100;
-    playhead.style.left = `${position}%`;
+export function updatePlayhead(currentTime, visualizer, playhead) {
+    if (!playhead || !visualizer.duration) return;
+
+    const position = positionOfTime(visualizer, currentTime);
+    playhead.style.left = `${position || 0}%`;
+    playhead.style.display = position === null ? 'none' : '';
 }
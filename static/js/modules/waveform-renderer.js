@@ -0,0 +1,151 @@
+/**
+ * Waveform Renderer Module - Peak pyramid and canvas drawing shared by the
+ * waveform worker and the main-thread fallback
+ */
+
+// Samples per bucket at the finest level of detail
+export const BASE_BUCKET_SIZE = 256;
+
+/**
+ * Build a min/max peak pyramid from PCM samples
+ * Level 0 holds one bucket per BASE_BUCKET_SIZE samples, each following
+ * level halves the resolution until a level fits in a few hundred buckets.
+ * @param {Float32Array} samples - Mono PCM samples
+ * @returns {Array} Levels of { bucketSize, min, max }
+ */
+export function buildPeakLevels(samples) {
+    const bucketCount = Math.max(1, Math.ceil(samples.length / BASE_BUCKET_SIZE));
+    let min = new Float32Array(bucketCount);
+    let max = new Float32Array(bucketCount);
+
+    for (let b = 0; b < bucketCount; b++) {
+        const start = b * BASE_BUCKET_SIZE;
+        const end = Math.min(start + BASE_BUCKET_SIZE, samples.length);
+        let lo = 0;
+        let hi = 0;
+        for (let i = start; i < end; i++) {
+            const value = samples[i];
+            if (value < lo) lo = value;
+            if (value > hi) hi = value;
+        }
+        min[b] = lo;
+        max[b] = hi;
+    }
+
+    const levels = [{ bucketSize: BASE_BUCKET_SIZE, min, max }];
+
+    while (min.length > 512) {
+        const count = Math.ceil(min.length / 2);
+        const nextMin = new Float32Array(count);
+        const nextMax = new Float32Array(count);
+        for (let b = 0; b < count; b++) {
+            const right = Math.min(2 * b + 1, min.length - 1);
+            nextMin[b] = Math.min(min[2 * b], min[right]);
+            nextMax[b] = Math.max(max[2 * b], max[right]);
+        }
+        min = nextMin;
+        max = nextMax;
+        levels.push({ bucketSize: levels[levels.length - 1].bucketSize * 2, min, max });
+    }
+
+    return levels;
+}
+
+/**
+ * Mean absolute amplitude per base bucket, used for drop detection once the PCM is gone
+ * @param {Float32Array} samples - Mono PCM samples
+ * @returns {Float32Array} Energy envelope at sampleRate / BASE_BUCKET_SIZE points per second
+ */
+export function buildEnergyEnvelope(samples) {
+    const bucketCount = Math.max(1, Math.ceil(samples.length / BASE_BUCKET_SIZE));
+    const energy = new Float32Array(bucketCount);
+
+    for (let b = 0; b < bucketCount; b++) {
+        const start = b * BASE_BUCKET_SIZE;
+        const end = Math.min(start + BASE_BUCKET_SIZE, samples.length);
+        let sum = 0;
+        for (let i = start; i < end; i++) {
+            sum += Math.abs(samples[i]);
+        }
+        energy[b] = sum / Math.max(1, end - start);
+    }
+
+    return energy;
+}
+
+/**
+ * Reduce the peak pyramid to one min/max pair per pixel column of the visible region
+ * Picks the coarsest level that still has at least one bucket per column,
+ * so the cost depends on the canvas width rather than the track length.
+ * @param {Array} levels - Peak pyramid from buildPeakLevels
+ * @param {number} sampleRate - Sample rate of the source PCM
+ * @param {number} start - Start of the visible region in seconds
+ * @param {number} end - End of the visible region in seconds
+ * @param {number} width - Number of pixel columns
+ * @returns {Object} { min, max } Float32Arrays of length width
+ */
+export function computeColumns(levels, sampleRate, start, end, width) {
+    const min = new Float32Array(width);
+    const max = new Float32Array(width);
+    if (!levels.length || width <= 0 || end <= start) return { min, max };
+
+    const samplesPerColumn = (end - start) * sampleRate / width;
+    let level = levels[0];
+    for (const candidate of levels) {
+        if (candidate.bucketSize <= samplesPerColumn) level = candidate;
+    }
+
+    const bucketsPerSecond = sampleRate / level.bucketSize;
+    const bucketCount = level.min.length;
+
+    for (let x = 0; x < width; x++) {
+        const from = Math.floor((start + (end - start) * x / width) * bucketsPerSecond);
+        const to = Math.max(from + 1, Math.floor((start + (end - start) * (x + 1) / width) * bucketsPerSecond));
+        let lo = 0;
+        let hi = 0;
+        for (let b = Math.max(0, from); b < Math.min(to, bucketCount); b++) {
+            if (level.min[b] < lo) lo = level.min[b];
+            if (level.max[b] > hi) hi = level.max[b];
+        }
+        min[x] = lo;
+        max[x] = hi;
+    }
+
+    return { min, max };
+}
+
+/**
+ * Paint waveform columns and the beat grid for the visible region
+ * @param {CanvasRenderingContext2D|OffscreenCanvasRenderingContext2D} ctx - 2D context
+ * @param {Object} frame - { width, height, min, max, start, end, bpm }
+ */
+export function paintFrame(ctx, frame) {
+    const { width, height, min, max, start, end, bpm } = frame;
+    const y = height / 2;
+
+    ctx.clearRect(0, 0, width, height);
+
+    // One gradient for the whole canvas instead of one per column
+    const gradient = ctx.createLinearGradient(0, 0, 0, height);
+    gradient.addColorStop(0, 'rgba(52, 152, 219, 0.8)');
+    gradient.addColorStop(0.5, 'rgba(52, 152, 219, 0.5)');
+    gradient.addColorStop(1, 'rgba(52, 152, 219, 0.8)');
+    ctx.fillStyle = gradient;
+
+    for (let x = 0; x < min.length; x++) {
+        const amplitude = Math.max(Math.abs(min[x]), Math.abs(max[x]));
+        ctx.fillRect(x, y - height / 2 * amplitude, 1, height * amplitude);
+    }
+
+    if (!bpm || bpm <= 0 || end <= start) return;
+
+    // Beat grid, with every 4th beat (1st beat of each bar) highlighted
+    const secondsPerBeat = 60 / bpm;
+    const pixelsPerSecond = width / (end - start);
+    for (let i = Math.ceil(start / secondsPerBeat); i * secondsPerBeat <= end; i++) {
+        const x = Math.round((i * secondsPerBeat - start) * pixelsPerSecond);
+        const isBar = i % 4 === 0;
+        ctx.fillStyle = isBar ? 'rgba(255, 255, 255, 0.4)' : 'rgba(255, 255, 255, 0.2)';
+        ctx.fillRect(x, 0, isBar ? 2 : 1, height);
+    }
+}
@@ -2,7 +2,7 @@
 
 // Global variables
 let audioContext;
-let audioBuffer;
+let trackDuration = 0; // Decoded PCM is handed to the waveform worker, only the duration is kept
 let isPlaying = false;
 let hotCues = [];
 let bpmValue = 0;
@@ -34,11 +34,12 @@ const toggleWaveformBtn = document.getElementById('toggle-waveform-btn');
 // Set initial volume
 audioPlayer.volume = currentVolume;
 
-// Create waveform canvas
-const waveformCanvas = document.createElement('canvas');
-waveformCanvas.id = 'waveform-canvas';
-waveformContainer.appendChild(waveformCanvas);
-const waveformCtx = waveformCanvas.getContext('2d');
+// Waveform canvas, peaks and beat grid are rendered off the main thread by the visualizer module
+let visualizer;
+const visualizerModule = import('./modules/audio-visualizer.js').then(module => {
+    visualizer = module.initVisualizer({ waveformContainer });
+    return module;
+});
 
 // Attach persistent event listeners (once, outside of initPlayer)
 playPauseBtn.addEventListener('click', togglePlayPause);
@@ -47,10 +48,10 @@ addCueBtn.addEventListener('click', () => {
 });
 exportCuesBtn.addEventListener('click', exportCuesToRekordbox);
 waveformContainer.addEventListener('click', (e) => {
-    if (!audioBuffer) return;
+    if (!trackDuration) return;
     const rect = waveformContainer.getBoundingClientRect();
     const clickPosition = (e.clientX - rect.left) / rect.width;
-    const seekTime = clickPosition * audioBuffer.duration;
+    const seekTime = clickPosition * trackDuration;
     audioPlayer.currentTime = seekTime;
     updatePlayhead();
 });
@@ -198,65 +199,6 @@ function formatTime(seconds) {
     return `${minutes}:${secs.toString().padStart(2, '0')}`;
 }
 
-// Draw the waveform visualization
-function drawWaveform(buffer) {
-    const width = waveformCanvas.width;
-    const height = waveformCanvas.height;
-    const channelData = buffer.getChannelData(0);
-    const step = Math.ceil(channelData.length / width);
-
-    waveformCtx.clearRect(0, 0, width, height);
-    waveformCtx.fillStyle = '#3498db';
-
-    for (let i = 0; i < width; i++) {
-        const start = Math.floor(i * step);
-        const end = Math.floor((i + 1) * step);
-        let min = channelData[start];
-        let max = channelData[start];
-
-        for (let j = start; j < end; j++) {
-            if (channelData[j] < min) min = channelData[j];
-            if (channelData[j] > max) max = channelData[j];
-        }
-
-        const y = height / 2;
-        const amplitude = Math.max(Math.abs(min), Math.abs(max));
-
-        const gradient = waveformCtx.createLinearGradient(0, y - height / 2 * amplitude, 0, y + height / 2 * amplitude);
-        gradient.addColorStop(0, 'rgba(52, 152, 219, 0.8)');
-        gradient.addColorStop(0.5, 'rgba(52, 152, 219, 0.5)');
-        gradient.addColorStop(1, 'rgba(52, 152, 219, 0.8)');
-
-        waveformCtx.fillStyle = gradient;
-        waveformCtx.fillRect(i, y - height / 2 * amplitude, 1, height * amplitude);
-    }
-}
-
-// Draw the beat grid based on BPM
-function drawBeatGrid(bpm, duration) {
-    beatGridContainer.innerHTML = '';
-
-    if (!bpm || bpm <= 0) return;
-
-    const beatsPerSecond = bpm / 60;
-    const totalBeats = beatsPerSecond * duration;
-
-    for (let i = 0; i < totalBeats; i++) {
-        const beatMarker = document.createElement('div');
-        beatMarker.className = 'beat-marker';
-        const beatTime = i / beatsPerSecond;
-        const position = (beatTime / duration) * 100;
-        beatMarker.style.left = `${position}%`;
-
-        if (i % 4 === 0) {
-            beatMarker.style.backgroundColor = 'rgba(255, 255, 255, 0.4)';
-            beatMarker.style.width = '2px';
-        }
-
-        beatGridContainer.appendChild(beatMarker);
-    }
-}
-
 // Create a hot cue
 function createHotCue(time, name) {
     const cueId = Date.now();
@@ -269,7 +211,7 @@ function createHotCue(time, name) {
 
 // Draw a hot cue marker on the waveform
 function drawHotCueMarker(cue) {
-    const duration = audioBuffer.duration;
+    const duration = trackDuration;
     const position = (cue.time / duration) * 100;
     const marker = document.createElement('div');
     marker.className = 'hot-cue-marker';
@@ -333,8 +275,8 @@ function deleteCue(cueId) {
 
 // Update the playhead position
 function updatePlayhead() {
-    if (!audioBuffer) return;
-    const duration = audioBuffer.duration;
+    if (!trackDuration) return;
+    const duration = trackDuration;
     const currentTime = audioPlayer.currentTime;
     const position = (currentTime / duration) * 100;
     playhead.style.left = `${position}%`;
@@ -355,7 +297,7 @@ function exportCuesToRekordbox() {
     xmlContent += '<DJ_PLAYLISTS Version="1.0.0">\n';
     xmlContent += '  <PRODUCT Name="rekordbox" Version="6.0.0" Company="Pioneer DJ"/>\n';
     xmlContent += '  <COLLECTION Entries="1">\n';
-    xmlContent += `    <TRACK Artist="${artist}" Title="${title}" Kind="MP3 File" BPM="${bpm}" Key="${key}" TotalTime="${formatTime(audioBuffer.duration)}">\n`;
+    xmlContent += `    <TRACK Artist="${artist}" Title="${title}" Kind="MP3 File" BPM="${bpm}" Key="${key}" TotalTime="${formatTime(trackDuration)}">\n`;
     hotCues.forEach(cue => {
         const timeMs = Math.floor(cue.time * 1000);
         xmlContent += `      <POSITION_MARK Name="${cue.name}" Type="0" Start="${timeMs}" Num="0"/>\n`;
@@ -424,14 +366,16 @@ function initPlayer(audioData) {
         totalTimeDisplay.textContent = formatTime(audioPlayer.duration);
         fetch(audioUrl)
             .then(response => response.arrayBuffer())
-            .then(buffer => audioContext.decodeAudioData(buffer))
-            .then(decodedBuffer => {
-                audioBuffer = decodedBuffer;
-                waveformCanvas.width = waveformContainer.offsetWidth;
-                waveformCanvas.height = waveformContainer.offsetHeight;
-                drawWaveform(audioBuffer);
+            .then(buffer => Promise.all([audioContext.decodeAudioData(buffer), visualizerModule]))
+            .then(([decodedBuffer, { resizeWaveform, loadWaveform, drawBeatGrid }]) => {
+                resizeWaveform(visualizer, waveformContainer.offsetWidth, waveformContainer.offsetHeight);
                 bpmValue = parseInt(document.getElementById('r-bpm').textContent) || 0;
-                drawBeatGrid(bpmValue, audioBuffer.duration);
+                drawBeatGrid(bpmValue, visualizer);
+                return loadWaveform(visualizer, decodedBuffer);
+            })
+            .then(envelope => {
+                // Null when a newer track replaced this one first
+                if (envelope) trackDuration = envelope.duration;
             })
             .catch(error => console.error('Error loading audio data:', error));
     }, { once: true });
@@ -493,7 +437,7 @@ function toggleWaveformSection() {
     localStorage.setItem('djDownloaderWaveformExpanded', isWaveformExpanded);
     
     // Trigger resize event to redraw waveform if it's now visible
-    if (isWaveformExpanded && audioBuffer) {
+    if (isWaveformExpanded && trackDuration) {
         setTimeout(() => {
             window.dispatchEvent(new Event('resize'));
         }, 100);
@@ -531,7 +475,8 @@ document.getElementById('download-form').addEventListener('submit', function (ev
     }
 
     // Clear waveform, beat grid, and hot cues
-    if (waveformCanvas) waveformCtx.clearRect(0, 0, waveformCanvas.width, waveformCanvas.height);
+    trackDuration = 0;
+    visualizerModule.then(({ clearWaveform }) => clearWaveform(visualizer));
     if (beatGridContainer) beatGridContainer.innerHTML = '';
     if (hotCuesContainer) hotCuesContainer.innerHTML = '';
 
@@ -612,11 +557,10 @@ function extractYouTubeId(url) {
 
 // Resize waveform and beat grid on window resize
 window.addEventListener('resize', () => {
-    if (audioBuffer) {
-        waveformCanvas.width = waveformContainer.offsetWidth;
-        waveformCanvas.height = waveformContainer.offsetHeight;
-        drawWaveform(audioBuffer);
-        drawBeatGrid(bpmValue, audioBuffer.duration);
+    if (trackDuration) {
+        visualizerModule.then(({ resizeWaveform }) => {
+            resizeWaveform(visualizer, waveformContainer.offsetWidth, waveformContainer.offsetHeight);
+        });
         redrawHotCueMarkers();
     }
 });
\ No newline at end of file
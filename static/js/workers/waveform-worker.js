@@ -0,0 +1,108 @@
+/**
+ * Waveform Worker - Computes waveform peaks and renders them off the main thread
+ *
+ * Messages in:
+ *   { type: 'canvas', canvas }                    OffscreenCanvas to draw into
+ *   { type: 'load', loadId, samples, sampleRate } Mono PCM (transferred, dropped after peaks are built)
+ *   { type: 'resize', width, height }             Canvas size in CSS pixels
+ *   { type: 'view', start, end }                  Visible region in seconds
+ *   { type: 'beatgrid', bpm }                     Beat grid tempo (0 hides the grid)
+ *   { type: 'clear' }                             Forget the current track
+ *
+ * Messages out:
+ *   { type: 'loaded', loadId, duration, energy, energyRate }
+ *   { type: 'frame', ... }                        Only without an OffscreenCanvas; the main thread paints it
+ */
+
+import { BASE_BUCKET_SIZE, buildPeakLevels, buildEnergyEnvelope, computeColumns, paintFrame } from '../modules/waveform-renderer.js';
+
+let canvas = null;
+let ctx = null;
+let levels = [];
+let sampleRate = 0;
+let width = 0;
+let height = 0;
+let view = { start: 0, end: 0 };
+let bpm = 0;
+let renderPending = false;
+
+self.onmessage = (event) => {
+    const message = event.data;
+
+    switch (message.type) {
+        case 'canvas':
+            canvas = message.canvas;
+            ctx = canvas.getContext('2d');
+            break;
+
+        case 'load': {
+            sampleRate = message.sampleRate;
+            levels = buildPeakLevels(message.samples);
+            const energy = buildEnergyEnvelope(message.samples);
+            const duration = message.samples.length / sampleRate;
+            view = { start: 0, end: duration };
+
+            self.postMessage({
+                type: 'loaded',
+                loadId: message.loadId,
+                duration,
+                energy,
+                energyRate: sampleRate / BASE_BUCKET_SIZE
+            }, [energy.buffer]);
+            break;
+        }
+
+        case 'resize':
+            width = Math.floor(message.width);
+            height = Math.floor(message.height);
+            if (canvas) {
+                canvas.width = width;
+                canvas.height = height;
+            }
+            break;
+
+        case 'view':
+            view = { start: message.start, end: message.end };
+            break;
+
+        case 'beatgrid':
+            bpm = message.bpm;
+            break;
+
+        case 'clear':
+            levels = [];
+            bpm = 0;
+            view = { start: 0, end: 0 };
+            break;
+    }
+
+    scheduleRender();
+};
+
+/**
+ * Coalesce bursts of messages (e.g. wheel zooming) into one render
+ */
+function scheduleRender() {
+    if (renderPending) return;
+    renderPending = true;
+    setTimeout(() => {
+        renderPending = false;
+        render();
+    }, 0);
+}
+
+/**
+ * Render the visible region, or hand the columns back if there is no OffscreenCanvas
+ */
+function render() {
+    if (!width || !height) return;
+
+    const columns = computeColumns(levels, sampleRate, view.start, view.end, width);
+    const frame = { width, height, ...columns, ...view, bpm };
+
+    if (ctx) {
+        paintFrame(ctx, frame);
+    } else {
+        self.postMessage({ type: 'frame', ...frame }, [columns.min.buffer, columns.max.buffer]);
+    }
+}